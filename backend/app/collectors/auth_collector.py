@@ -4,10 +4,11 @@ Collecteur de logs d'authentification
 Parse /var/log/auth.log et extrait les événements de sécurité
 """
 
-import re
 from datetime import datetime
-from typing import List, Dict
-import subprocess
+from typing import List, Dict, Optional
+
+import parser
+from log_reader import read_last_lines
 
 
 class AuthLogCollector:
@@ -15,145 +16,50 @@ class AuthLogCollector:
     
     def __init__(self, log_path: str = "/var/log/auth.log"):
         self.log_path = log_path
+        # Les lignes syslog n'ont pas d'année: rafraîchie à chaque collecte
+        self._year = datetime.now().year
         
     def read_logs(self, lines: int = 100) -> List[str]:
         """Lit les N dernières lignes du fichier de log"""
-        try:
-            result = subprocess.run(
-                ['sudo', 'tail', '-n', str(lines), self.log_path],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            return result.stdout.strip().split('\n')
-        except subprocess.CalledProcessError as e:
-            print(f"Erreur lecture logs: {e}")
-            return []
+        return read_last_lines(self.log_path, lines)
     
-    def parse_log_line(self, line: str) -> Dict:
+    def parse_log_line(self, line: str) -> Optional[Dict]:
         """Parse une ligne de log et extrait les informations"""
         
-        # Pattern général: Jan 21 22:04:35 hostname process[pid]: message
-        pattern = r'(\w+\s+\d+\s+\d+:\d+:\d+)\s+(\S+)\s+(\S+?)(?:\[(\d+)\])?:\s+(.+)'
-        match = re.match(pattern, line)
-        
-        if not match:
-            return None
-            
-        timestamp_str, hostname, process, pid, message = match.groups()
-        
-        # Convertir timestamp
-        current_year = datetime.now().year
-        timestamp = datetime.strptime(f"{current_year} {timestamp_str}", "%Y %b %d %H:%M:%S")
-        
-        # Détection du type d'événement
-        event_type = self._detect_event_type(process, message)
+        log = parser.parse_log_line(line, self._year)
         
-        # Extraction utilisateur
-        user = self._extract_user(message)
-        
-        # Extraction IP (si présente)
-        ip_address = self._extract_ip(message)
-        
-        # Scoring de risque basique
-        risk_score = self._calculate_risk(event_type, message)
-        
-        return {
-            'timestamp': timestamp.isoformat(),
-            'hostname': hostname,
-            'process': process,
-            'pid': pid,
-            'event_type': event_type,
-            'user': user,
-            'ip_address': ip_address,
-            'message': message,
-            'risk_score': risk_score,
-            'raw_log': line
-        }
+        return self._to_output(log) if log else None
     
-    def _detect_event_type(self, process: str, message: str) -> str:
-        """Détecte le type d'événement de sécurité"""
-        
-        if 'sudo' in process.lower():
-            return 'SUDO_COMMAND'
-        elif 'session opened' in message:
-            return 'SESSION_OPEN'
-        elif 'session closed' in message:
-            return 'SESSION_CLOSE'
-        elif 'authentication failure' in message.lower():
-            return 'AUTH_FAILURE'
-        elif 'accepted' in message.lower():
-            return 'AUTH_SUCCESS'
-        elif 'invalid user' in message.lower():
-            return 'INVALID_USER'
-        elif 'cron' in process.lower():
-            return 'CRON_JOB'
-        else:
-            return 'OTHER'
-    
-    def _extract_user(self, message: str) -> str:
-        """Extrait le nom d'utilisateur du message"""
-        
-        patterns = [
-            r'user (\w+)',
-            r'for (\w+)',
-            r'by \(uid=\d+\)',  # Pour root
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, message)
-            if match:
-                return match.group(1) if match.lastindex else 'root'
+    def parse_logs(self, raw_logs: List[str]) -> List[Dict]:
+        """Parse un lot de lignes (équivalent à parse_log_line sur chaque ligne)"""
         
-        return 'unknown'
+        return [self._to_output(log) for log in parser.parse_many(raw_logs, self._year)]
     
-    def _extract_ip(self, message: str) -> str:
-        """Extrait l'adresse IP si présente"""
+    def _to_output(self, log: Dict) -> Dict:
+        """Adapte un log parsé au format JSON du collecteur"""
         
-        ip_pattern = r'\b(?:\d{1,3}\.){3}\d{1,3}\b'
-        match = re.search(ip_pattern, message)
-        
-        return match.group(0) if match else None
-    
-    def _calculate_risk(self, event_type: str, message: str) -> int:
-        """Calcule un score de risque basique (0-10)"""
-        
-        risk_scores = {
-            'AUTH_FAILURE': 7,
-            'INVALID_USER': 8,
-            'SUDO_COMMAND': 5,
-            'AUTH_SUCCESS': 2,
-            'SESSION_OPEN': 3,
-            'SESSION_CLOSE': 1,
-            'CRON_JOB': 1,
-            'OTHER': 2
+        return {
+            'timestamp': log['timestamp'].isoformat(),
+            'hostname': log['hostname'],
+            'process': log['process'],
+            'pid': str(log['pid']) if log['pid'] is not None else None,
+            'event_type': log['event_type'],
+            'user': log['user_name'],
+            'ip_address': log['ip_address'],
+            'message': log['message'],
+            'risk_score': log['risk_score'],
+            'raw_log': log['raw_log']
         }
-        
-        base_score = risk_scores.get(event_type, 2)
-        
-        # Augmenter le score pour certains mots-clés
-        if 'failed' in message.lower():
-            base_score += 2
-        if 'root' in message.lower():
-            base_score += 1
-            
-        return min(base_score, 10)
     
     def collect(self, lines: int = 50) -> List[Dict]:
         """Collecte et parse les logs"""
         
         print(f"🔍 Collecte des {lines} dernières lignes de {self.log_path}...\n")
         
+        self._year = datetime.now().year
         raw_logs = self.read_logs(lines)
-        parsed_logs = []
-        
-        for log_line in raw_logs:
-            if log_line.strip():
-                parsed = self.parse_log_line(log_line)
-                if parsed:
-                    parsed_logs.append(parsed)
         
-        return parsed_logs
+        return self.parse_logs(raw_logs)
     
     def display_summary(self, logs: List[Dict]):
         """Affiche un résumé des logs collectés"""
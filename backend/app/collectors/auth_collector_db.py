@@ -9,189 +9,170 @@ import os
 # Ajouter le chemin parent pour importer les modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-import re
+import asyncio
 from datetime import datetime
-from typing import List, Dict
-import subprocess
+from typing import List, Dict, Optional, Tuple
+import asyncpg
 from sqlalchemy.orm import Session
-from database import SessionLocal, engine, Base
+from database import DATABASE_URL, SessionLocal, engine, Base
 from models import Log
 
+import parser
+from log_reader import load_checkpoint, read_new_lines, save_checkpoint
+
+
+# Colonnes de la table logs écrites par COPY, dans l'ordre des tuples envoyés
+_COPY_COLUMNS = (
+    'timestamp', 'hostname', 'process', 'pid', 'event_type',
+    'user_name', 'ip_address', 'message', 'risk_score', 'raw_log'
+)
+
+# Bornes de la taille des lots parsés puis envoyés par COPY (mode pipeline)
+_MIN_BATCH_SIZE = 128
+_MAX_BATCH_SIZE = 4096
+
+# Erreurs propres à une ligne (valeur refusée par un codec asyncpg ou par
+# PostgreSQL): la ligne est écartée au lieu de bloquer toute la collecte
+_ROW_ERRORS = (asyncpg.DataError, ValueError, TypeError, OverflowError)
+
 
 class AuthLogCollectorDB:
     """Collecte et sauvegarde les logs d'authentification en base de données"""
     
-    def __init__(self, log_path: str = "/var/log/auth.log"):
+    def __init__(self, log_path: str = "/var/log/auth.log",
+                 checkpoint_path: str = "auth_log_checkpoint.json"):
         self.log_path = log_path
+        # Position {inode, offset} de la dernière ligne sauvegardée
+        self.checkpoint_path = checkpoint_path
+        # Les lignes syslog n'ont pas d'année: rafraîchie à chaque collecte
+        self._year = datetime.now().year
         
-    def read_logs(self, lines: int = 100) -> List[str]:
-        """Lit les N dernières lignes du fichier de log"""
-        try:
-            result = subprocess.run(
-                ['sudo', 'tail', '-n', str(lines), self.log_path],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            return result.stdout.strip().split('\n')
-        except subprocess.CalledProcessError as e:
-            print(f"Erreur lecture logs: {e}")
-            return []
-    
-    def parse_log_line(self, line: str) -> Dict:
+    def parse_log_line(self, line: str) -> Optional[Dict]:
         """Parse une ligne de log et extrait les informations"""
-        
-        pattern = r'(\w+\s+\d+\s+\d+:\d+:\d+)\s+(\S+)\s+(\S+?)(?:\[(\d+)\])?:\s+(.+)'
-        match = re.match(pattern, line)
-        
-        if not match:
-            return None
-            
-        timestamp_str, hostname, process, pid, message = match.groups()
-        
-        # Convertir timestamp
-        current_year = datetime.now().year
-        timestamp = datetime.strptime(f"{current_year} {timestamp_str}", "%Y %b %d %H:%M:%S")
-        
-        # Détection du type d'événement
-        event_type = self._detect_event_type(process, message)
-        
-        # Extraction utilisateur
-        user = self._extract_user(message)
-        
-        # Extraction IP
-        ip_address = self._extract_ip(message)
-        
-        # Scoring de risque
-        risk_score = self._calculate_risk(event_type, message)
-        
-        return {
-            'timestamp': timestamp,
-            'hostname': hostname,
-            'process': process,
-            'pid': int(pid) if pid else None,
-            'event_type': event_type,
-            'user_name': user,
-            'ip_address': ip_address,
-            'message': message,
-            'risk_score': risk_score,
-            'raw_log': line
-        }
+        return parser.parse_log_line(line, self._year)
     
-    def _detect_event_type(self, process: str, message: str) -> str:
-        """Détecte le type d'événement de sécurité"""
-        if 'sudo' in process.lower():
-            return 'SUDO_COMMAND'
-        elif 'session opened' in message:
-            return 'SESSION_OPEN'
-        elif 'session closed' in message:
-            return 'SESSION_CLOSE'
-        elif 'authentication failure' in message.lower():
-            return 'AUTH_FAILURE'
-        elif 'accepted' in message.lower():
-            return 'AUTH_SUCCESS'
-        elif 'invalid user' in message.lower():
-            return 'INVALID_USER'
-        elif 'cron' in process.lower():
-            return 'CRON_JOB'
-        else:
-            return 'OTHER'
-    
-    def _extract_user(self, message: str) -> str:
-        """Extrait le nom d'utilisateur du message"""
-        patterns = [
-            r'user (\w+)',
-            r'for (\w+)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, message)
-            if match:
-                return match.group(1)
-        
-        if 'root' in message.lower():
-            return 'root'
-        
-        return 'unknown'
-    
-    def _extract_ip(self, message: str) -> str:
-        """Extrait l'adresse IP si présente"""
-        ip_pattern = r'\b(?:\d{1,3}\.){3}\d{1,3}\b'
-        match = re.search(ip_pattern, message)
-        return match.group(0) if match else None
-    
-    def _calculate_risk(self, event_type: str, message: str) -> int:
-        """Calcule un score de risque (0-10)"""
-        risk_scores = {
-            'AUTH_FAILURE': 7,
-            'INVALID_USER': 8,
-            'SUDO_COMMAND': 5,
-            'AUTH_SUCCESS': 2,
-            'SESSION_OPEN': 3,
-            'SESSION_CLOSE': 1,
-            'CRON_JOB': 1,
-            'OTHER': 2
-        }
-        
-        base_score = risk_scores.get(event_type, 2)
-        
-        if 'failed' in message.lower():
-            base_score += 2
-        if 'root' in message.lower():
-            base_score += 1
-            
-        return min(base_score, 10)
+    def parse_logs(self, raw_logs: List[str]) -> List[Dict]:
+        """Parse un lot de lignes (équivalent à parse_log_line sur chaque ligne)"""
+        return parser.parse_many(raw_logs, self._year)
     
-    def save_to_database(self, logs: List[Dict], db: Session) -> int:
-        """Sauvegarde les logs en base de données"""
-        saved_count = 0
+    async def collect_and_save(self, lines: int = 50):
+        """
+        Collecte les logs ajoutés depuis la dernière collecte et les sauvegarde
+        en base (les N dernières lignes au premier lancement)
+        """
+        checkpoint = load_checkpoint(self.checkpoint_path)
+        if checkpoint is None:
+            print(f"Collecte des {lines} dernières lignes de {self.log_path}...\n")
+        else:
+            print(f"Collecte des nouvelles lignes de {self.log_path}...\n")
         
-        for log_data in logs:
-            try:
-                log = Log(**log_data)
-                db.add(log)
-                saved_count += 1
-            except Exception as e:
-                print(f"Erreur sauvegarde log: {e}")
-                continue
+        self._year = datetime.now().year
         
-        try:
-            db.commit()
-            print(f"{saved_count} logs sauvegardés en base de données")
-        except Exception as e:
-            db.rollback()
-            print(f"Erreur commit: {e}")
-            saved_count = 0
+        # Lire les logs: étape séparée, hors pipeline. Avec le checkpoint, seules
+        # les lignes ajoutées depuis la dernière collecte sont lues, un volume
+        # trop faible pour gagner à recouvrir la lecture avec le parsing
+        raw_logs, new_checkpoint = await asyncio.to_thread(read_new_lines, self.log_path, checkpoint, lines)
         
-        return saved_count
-    
-    def collect_and_save(self, lines: int = 50):
-        """Collecte les logs et les sauvegarde en base"""
-        print(f"Collecte des {lines} dernières lignes de {self.log_path}...\n")
-        
-        # Lire les logs
-        raw_logs = self.read_logs(lines)
-        parsed_logs = []
+        # Parser et sauvegarder en pipeline
+        conn = await asyncpg.connect(DATABASE_URL)
+        try:
+            parsed, saved, success = await self._parse_and_copy(raw_logs, conn)
+        finally:
+            await conn.close()
         
-        for log_line in raw_logs:
-            if log_line.strip():
-                parsed = self.parse_log_line(log_line)
-                if parsed:
-                    parsed_logs.append(parsed)
+        print(f"{parsed} logs parsés")
+        print(f"{saved} logs sauvegardés en base de données")
         
-        print(f"{len(parsed_logs)} logs parsés\n")
+        # Avancer le checkpoint seulement si parsing et COPY ont abouti:
+        # sinon ces lignes seront reprises à la prochaine collecte
+        if new_checkpoint is not None and success:
+            save_checkpoint(self.checkpoint_path, new_checkpoint)
         
-        # Sauvegarder en base
+        # Afficher stats
         db = SessionLocal()
         try:
-            saved = self.save_to_database(parsed_logs, db)
-            
-            # Afficher stats
             self.display_stats(db)
-            
         finally:
             db.close()
     
+    async def _parse_and_copy(self, raw_logs: List[str], conn: asyncpg.Connection) -> Tuple[int, int, bool]:
+        """
+        Parse les lignes par lots dans un thread pendant que le lot précédent
+        est envoyé par COPY. Retourne (logs parsés, logs sauvegardés, succès)
+        """
+        queue = asyncio.Queue()
+        
+        async def produce():
+            batch_size = _MIN_BATCH_SIZE
+            try:
+                pos = 0
+                while pos < len(raw_logs):
+                    batch = raw_logs[pos:pos + batch_size]
+                    pos += len(batch)
+                    parsed_batch = await asyncio.to_thread(self.parse_logs, batch)
+                    
+                    # Lots en attente: la base est le goulot, on grossit les lots
+                    # pour amortir chaque COPY. File vide: la base attend le
+                    # parsing, on réduit les lots pour l'alimenter plus tôt.
+                    if queue.empty():
+                        batch_size = max(batch_size // 2, _MIN_BATCH_SIZE)
+                    else:
+                        batch_size = min(batch_size * 2, _MAX_BATCH_SIZE)
+                    queue.put_nowait(parsed_batch)
+            finally:
+                queue.put_nowait(None)
+        
+        producer = asyncio.create_task(produce())
+        parsed = 0
+        
+        saved = 0
+        
+        try:
+            # Une seule transaction: tout ou rien, hors lignes refusées
+            async with conn.transaction():
+                while (logs := await queue.get()) is not None:
+                    parsed += len(logs)
+                    saved += await self._copy_batch(logs, conn)
+                await producer
+        except Exception as e:
+            producer.cancel()
+            print(f"Erreur sauvegarde logs: {e}")
+            return parsed, 0, False
+        
+        return parsed, saved, True
+    
+    async def _copy_batch(self, logs: List[Dict], conn: asyncpg.Connection) -> int:
+        """
+        Envoie un lot par COPY dans un savepoint. Si une ligne est refusée,
+        le lot est repris ligne par ligne et seules les lignes fautives sont
+        écartées. Retourne le nombre de logs sauvegardés
+        """
+        try:
+            async with conn.transaction():
+                await self._copy_records(logs, conn)
+            return len(logs)
+        except _ROW_ERRORS:
+            pass
+        
+        saved = 0
+        for log in logs:
+            try:
+                async with conn.transaction():
+                    await self._copy_records([log], conn)
+                saved += 1
+            except _ROW_ERRORS as e:
+                print(f"Log ignoré ({e}): {log['raw_log'][:80]}")
+        
+        return saved
+    
+    async def _copy_records(self, logs: List[Dict], conn: asyncpg.Connection):
+        """Envoie les logs par COPY (copy_records_to_table)"""
+        await conn.copy_records_to_table(
+            Log.__tablename__,
+            records=[tuple(log[column] for column in _COPY_COLUMNS) for log in logs],
+            columns=_COPY_COLUMNS
+        )
+    
     def display_stats(self, db: Session):
         """Affiche les statistiques de la base de données"""
         from sqlalchemy import func
@@ -240,7 +221,7 @@ def main():
     print()
     
     collector = AuthLogCollectorDB()
-    collector.collect_and_save(lines=100)
+    asyncio.run(collector.collect_and_save(lines=100))
     
     print("\nCollecte terminée!")
     print("Vous pouvez maintenant interroger la base avec SQL")
@@ -0,0 +1,172 @@
+"""
+Lecture des fichiers de log pour les collecteurs
+"""
+
+import json
+import mmap
+import os
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+
+def read_last_lines(log_path: str, lines: int = 100) -> List[str]:
+    """Lit les N dernières lignes du fichier de log"""
+    try:
+        with open(log_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+
+            # Projection en mémoire: seules les pages de la fin sont lues
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                end = len(mm)
+                # Le saut de ligne final ne commence pas une nouvelle ligne
+                pos = end - 1 if mm[end - 1] == ord('\n') else end
+
+                # Remonter de N sauts de ligne depuis la fin
+                start = None
+                for _ in range(lines):
+                    pos = mm.rfind(b'\n', 0, pos)
+                    if pos == -1:
+                        start = 0
+                        break
+                if start is None:
+                    start = pos + 1
+
+                data = mm[start:end]
+    except PermissionError:
+        # Fichier réservé à root/adm: repli sur sudo tail
+        return _read_last_lines_sudo(log_path, lines)
+    except OSError as e:
+        print(f"Erreur lecture logs: {e}")
+        return []
+
+    return _split_lines(data)
+
+
+def _split_lines(data: bytes) -> List[str]:
+    """Découpe sur '\\n' seulement, comme les sauts de ligne comptés par rfind"""
+    # str.splitlines couperait aussi sur \r, \x0b, \x1c, \x85, \u2028...
+    if data.endswith(b'\n'):
+        data = data[:-1]
+    return data.decode('utf-8', 'replace').split('\n')
+
+
+def _read_last_lines_sudo(log_path: str, lines: int) -> List[str]:
+    """Lit les N dernières lignes via sudo tail"""
+    try:
+        result = subprocess.run(
+            ['sudo', 'tail', '-n', str(lines), log_path],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        return result.stdout.strip().split('\n')
+    except subprocess.CalledProcessError as e:
+        print(f"Erreur lecture logs: {e}")
+        return []
+
+
+def load_checkpoint(checkpoint_path: str) -> Optional[Dict]:
+    """Charge le checkpoint {inode, offset} de la dernière collecte"""
+    try:
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Checkpoint illisible, reprise sur les dernières lignes: {e}")
+        return None
+    
+    # JSON valide mais mal formé ({}, [], offset négatif...): même repli
+    if (not isinstance(checkpoint, dict)
+            or not all(type(checkpoint.get(key)) is int for key in ('inode', 'offset'))
+            or checkpoint['offset'] < 0):
+        print(f"Checkpoint illisible, reprise sur les dernières lignes: {checkpoint!r}")
+        return None
+    
+    return checkpoint
+
+
+def save_checkpoint(checkpoint_path: str, checkpoint: Dict):
+    """Enregistre le checkpoint (écriture atomique via fichier temporaire)"""
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def read_new_lines(log_path: str, checkpoint: Optional[Dict], lines: int = 100) -> Tuple[List[str], Optional[Dict]]:
+    """
+    Lit les lignes ajoutées depuis le checkpoint {inode, offset}.
+    Sans checkpoint, lit les N dernières lignes complètes.
+    Retourne (lignes, nouveau checkpoint)
+    """
+    try:
+        with open(log_path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            if checkpoint is not None:
+                offset = _resume_offset(st, checkpoint)
+            elif st.st_size == 0:
+                offset = 0
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    offset = _tail_offset(mm, lines)
+            f.seek(offset)
+            data = f.read()
+    except PermissionError:
+        # Fichier réservé à root/adm: stat reste possible, lecture via sudo
+        try:
+            st = os.stat(log_path)
+        except OSError as e:
+            print(f"Erreur lecture logs: {e}")
+            return [], checkpoint
+        offset = _resume_offset(st, checkpoint) if checkpoint is not None else 0
+        data = _read_from_sudo(log_path, offset)
+        if data is None:
+            return [], checkpoint
+        if checkpoint is None:
+            # Premier passage: le fichier lu en entier, on garde la fin
+            offset = _tail_offset(data, lines)
+            data = data[offset:]
+    except OSError as e:
+        print(f"Erreur lecture logs: {e}")
+        return [], checkpoint
+    
+    # Une ligne en cours d'écriture sera relue complète à la prochaine collecte
+    end = data.rfind(b'\n') + 1
+    new_lines = _split_lines(data[:end]) if end else []
+    
+    return new_lines, {'inode': st.st_ino, 'offset': offset + end}
+
+
+def _tail_offset(buffer, lines: int) -> int:
+    """Offset du début des N dernières lignes complètes (mmap ou bytes)"""
+    # Fin de la dernière ligne complète, puis N sauts de ligne en arrière
+    pos = buffer.rfind(b'\n')
+    for _ in range(lines):
+        if pos == -1:
+            break
+        pos = buffer.rfind(b'\n', 0, pos)
+    return pos + 1
+
+
+def _resume_offset(st: os.stat_result, checkpoint: Dict) -> int:
+    """Position de reprise dans le fichier décrit par st"""
+    # Rotation (nouvel inode) ou troncature: le fichier est relu depuis le début
+    if st.st_ino != checkpoint['inode'] or st.st_size < checkpoint['offset']:
+        return 0
+    return checkpoint['offset']
+
+
+def _read_from_sudo(log_path: str, offset: int) -> Optional[bytes]:
+    """Lit le fichier à partir de l'offset via sudo tail"""
+    try:
+        result = subprocess.run(
+            ['sudo', 'tail', '-c', f'+{offset + 1}', log_path],
+            capture_output=True,
+            check=True
+        )
+        return result.stdout
+    except subprocess.CalledProcessError as e:
+        print(f"Erreur lecture logs: {e}")
+        return None
@@ -0,0 +1,268 @@
+"""
+Parsing des lignes de /var/log/auth.log
+Code commun aux collecteurs (fichier JSON et base de données)
+"""
+
+import functools
+import ipaddress
+import re
+import sys
+from datetime import datetime
+from typing import List, Dict, FrozenSet, Optional, Tuple
+
+
+# Nombre de messages distincts dont l'analyse est gardée en cache
+_EVENT_CACHE_SIZE = 8192
+
+# Mois syslog -> numéro, pour éviter strptime sur chaque ligne
+_MONTHS = {
+    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+    'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12
+}
+
+# Plus grand PID stockable dans la colonne pid (INTEGER)
+_MAX_PID = 2**31 - 1
+
+# Patterns compilés une seule fois au chargement du module
+# Pattern général: Jan 21 22:04:35 hostname process[pid]: message
+_LINE_PATTERN = (
+    r'(?P<ts>\w+\s+\d+\s+\d+:\d+:\d+)\s+(?P<host>\S+)\s+(?P<proc>\S+?)'
+    r'(?:\[(?P<pid>\d+)\])?:\s+(?P<msg>.+)'
+)
+_LINE_RE = re.compile(_LINE_PATTERN)
+
+_USER_RES = [re.compile(p) for p in (
+    r'user (\w+)',
+    r'for (\w+)',
+    r'by \(uid=\d+\)',  # Pour root
+)]
+_IP_PATTERN = r'\b(?:\d{1,3}\.){3}\d{1,3}\b'
+_IP_RE = re.compile(_IP_PATTERN)
+
+# Mots-clés recherchés dans le message, en minuscules.
+# Le message n'est mis en minuscules qu'une fois par ligne.
+_KEYWORDS = (
+    'session opened',
+    'session closed',
+    'authentication failure',
+    'accepted',
+    'invalid user',
+    'failed',
+    'root',
+)
+
+# Score de base par type d'événement
+_RISK_SCORES = {
+    'AUTH_FAILURE': 7,
+    'INVALID_USER': 8,
+    'SUDO_COMMAND': 5,
+    'AUTH_SUCCESS': 2,
+    'SESSION_OPEN': 3,
+    'SESSION_CLOSE': 1,
+    'CRON_JOB': 1,
+    'OTHER': 2
+}
+
+# Score final précalculé pour chaque combinaison (type, "failed", "root").
+# Index: (indice du type << 2) | (failed << 1) | root
+_EVENT_INDEX = {event_type: i for i, event_type in enumerate(_RISK_SCORES)}
+_RISK_TABLE = [
+    min(base_score + 2 * failed + root, 10)
+    for base_score in _RISK_SCORES.values()
+    for failed in (0, 1)
+    for root in (0, 1)
+]
+
+
+def parse_log_line(line: str, year: Optional[int] = None) -> Optional[Dict]:
+    """
+    Parse une ligne de log et extrait les informations
+    Les clés du dictionnaire correspondent aux colonnes de la table logs
+    """
+    fields = _split_line(line)
+
+    if fields is None:
+        # Format inhabituel: le pattern complet tranche
+        match = _LINE_RE.match(line)
+
+        if not match:
+            return None
+
+        fields = match.group('ts', 'host', 'proc', 'pid', 'msg')
+
+    timestamp_str, hostname, process, pid, message = fields
+
+    # Peu de valeurs distinctes: une seule copie partagée de chaque chaîne
+    hostname = sys.intern(hostname)
+    process = sys.intern(process)
+
+    # Convertir timestamp
+    try:
+        timestamp = _parse_timestamp(timestamp_str, year or datetime.now().year)
+    except ValueError:
+        # Date impossible pour l'année supposée (29 février...): ligne écartée
+        return None
+
+    # PID hors de portée de la colonne INTEGER (tag syslog forgé): ignoré
+    pid = int(pid) if pid else None
+    if pid is not None and pid > _MAX_PID:
+        pid = None
+
+    # Analyse du message (mise en cache)
+    event_type, user, ip_address, risk_score = _parse_event_fields(process, message)
+
+    return {
+        'timestamp': timestamp,
+        'hostname': hostname,
+        'process': process,
+        'pid': pid,
+        'event_type': event_type,
+        'user_name': user,
+        'ip_address': ip_address,
+        'message': message,
+        'risk_score': risk_score,
+        'raw_log': line
+    }
+
+
+def parse_many(lines: List[str], year: Optional[int] = None) -> List[Dict]:
+    """
+    Parse un lot de lignes avec parse_log_line
+    Les lignes non reconnues sont écartées
+    """
+    year = year or datetime.now().year
+
+    return [log for log in (parse_log_line(line, year) for line in lines) if log]
+
+
+def _split_line(line: str) -> Optional[Tuple[str, str, str, Optional[str], str]]:
+    """
+    Découpage positionnel d'une ligne syslog, sans regex
+    Retourne None dès que la ligne s'écarte du format courant; parse_log_line
+    utilise alors _LINE_RE, qui reste la référence
+    """
+    # Timestamp de largeur fixe: "Jan 21 22:04:35" ou "Jan  2 22:04:35"
+    timestamp_str = line[:15]
+    if (timestamp_str[:3] not in _MONTHS
+            or timestamp_str[3:7:3] != '  '
+            or timestamp_str[9:13:3] != '::'
+            or not (timestamp_str[5] + timestamp_str[7:9] + timestamp_str[10:12] + timestamp_str[13:15]).isdecimal()
+            or not (timestamp_str[4] == ' ' or timestamp_str[4].isdecimal())
+            or not line[15:16].isspace()
+            or '\n' in line):
+        return None
+
+    # hostname, process[pid]: et message sont séparés par des blancs
+    parts = line[15:].split(None, 2)
+    if len(parts) != 3 or len(parts[1]) < 2 or parts[1][-1] != ':':
+        return None
+    hostname, proc_pid, message = parts
+    proc_pid = proc_pid[:-1]
+
+    # PID optionnel entre crochets en fin de nom de processus
+    if proc_pid[-1] == ']':
+        bracket = proc_pid.rfind('[')
+        pid = proc_pid[bracket + 1:-1]
+        if bracket > 0 and pid.isdecimal():
+            return timestamp_str, hostname, proc_pid[:bracket], pid, message
+
+    return timestamp_str, hostname, proc_pid, None, message
+
+
+def _parse_timestamp(timestamp_str: str, year: int) -> datetime:
+    """Convertit un timestamp syslog (Jan 21 22:04:35) en datetime"""
+    month, day, hms = timestamp_str.split()
+    hour, minute, second = hms.split(':')
+
+    try:
+        return datetime(year, _MONTHS[month], int(day), int(hour), int(minute), int(second))
+    except KeyError:
+        # Mois non standard: strptime gère la locale (ou lève l'erreur)
+        return datetime.strptime(f"{year} {timestamp_str}", "%Y %b %d %H:%M:%S")
+
+
+@functools.lru_cache(maxsize=_EVENT_CACHE_SIZE)
+def _parse_event_fields(process: str, message: str) -> Tuple[str, str, Optional[str], int]:
+    """
+    Analyse le message: type d'événement, utilisateur, IP et score
+    Indépendant du timestamp, donc mis en cache pour les messages répétés
+    """
+    # Détection du type d'événement
+    keywords = _find_keywords(message)
+    event_type = _detect_event_type(process, keywords)
+
+    # Extraction utilisateur et IP (si présente)
+    user, ip_address = _extract_fields(message, keywords)
+
+    # Scoring de risque
+    risk_score = _calculate_risk(event_type, keywords)
+
+    return event_type, user, ip_address, risk_score
+
+
+def _find_keywords(message: str) -> FrozenSet[str]:
+    """Retourne les mots-clés de _KEYWORDS présents dans le message"""
+    message_lc = message.lower()
+    return frozenset(kw for kw in _KEYWORDS if kw in message_lc)
+
+
+def _detect_event_type(process: str, keywords: FrozenSet[str]) -> str:
+    """Détecte le type d'événement de sécurité"""
+    process_lc = process.lower()
+
+    if 'sudo' in process_lc:
+        return 'SUDO_COMMAND'
+    elif 'session opened' in keywords:
+        return 'SESSION_OPEN'
+    elif 'session closed' in keywords:
+        return 'SESSION_CLOSE'
+    elif 'authentication failure' in keywords:
+        return 'AUTH_FAILURE'
+    elif 'accepted' in keywords:
+        return 'AUTH_SUCCESS'
+    elif 'invalid user' in keywords:
+        return 'INVALID_USER'
+    elif 'cron' in process_lc:
+        return 'CRON_JOB'
+    else:
+        return 'OTHER'
+
+
+def _extract_fields(message: str, keywords: FrozenSet[str]) -> Tuple[str, Optional[str]]:
+    """Extrait le nom d'utilisateur et l'adresse IP du message"""
+    # Priorité: user, puis for, puis root (uid ou mot-clé)
+    for pattern in _USER_RES:
+        match = pattern.search(message)
+        if match:
+            user = match.group(1) if match.lastindex else 'root'
+            break
+    else:
+        user = 'root' if 'root' in keywords else 'unknown'
+
+    # Une IP contient au moins 3 points: sinon, inutile de la chercher
+    if message.count('.') >= 3:
+        for match in _IP_RE.finditer(message):
+            # Le pattern accepte 999.999.999.999, que la colonne INET refuse
+            if _is_ip_address(match.group(0)):
+                return user, match.group(0)
+
+    return user, None
+
+
+def _is_ip_address(candidate: str) -> bool:
+    """Vérifie qu'une chaîne est une adresse IP valide"""
+    try:
+        ipaddress.ip_address(candidate)
+    except ValueError:
+        return False
+    return True
+
+
+def _calculate_risk(event_type: str, keywords: FrozenSet[str]) -> int:
+    """Calcule un score de risque (0-10)"""
+    index = (
+        (_EVENT_INDEX.get(event_type, _EVENT_INDEX['OTHER']) << 2)
+        | (('failed' in keywords) << 1)
+        | ('root' in keywords)
+    )
+    return _RISK_TABLE[index]
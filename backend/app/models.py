@@ -2,7 +2,7 @@
 Modèles SQLAlchemy pour la base de données
 """
 
-from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, Boolean, Float, BigInteger
+from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, Boolean, Float, BigInteger, Index
 from sqlalchemy.dialects.postgresql import INET
 from sqlalchemy.sql import func
 from database import Base
@@ -25,5 +25,11 @@ class Log(Base):
     raw_log = Column(Text)
     collected_at = Column(TIMESTAMP, server_default=func.now())
     
+    # Index utilisés par les statistiques (mêmes noms que scripts/init_db.sql)
+    __table_args__ = (
+        Index('idx_logs_event_type', event_type),
+        Index('idx_logs_risk_timestamp', risk_score.desc(), timestamp.desc()),
+    )
+    
     def __repr__(self):
         return f"<Log(id={self.id}, event_type={self.event_type}, risk_score={self.risk_score})>"
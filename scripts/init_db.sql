@@ -36,7 +36,8 @@ CREATE TABLE IF NOT EXISTS logs (
 -- Index pour améliorer les performances
 CREATE INDEX idx_logs_timestamp ON logs(timestamp DESC);
 CREATE INDEX idx_logs_event_type ON logs(event_type);
-CREATE INDEX idx_logs_risk_score ON logs(risk_score DESC);
+-- Composite: sert aussi les filtres sur risk_score seul (top N par risque puis date)
+CREATE INDEX idx_logs_risk_timestamp ON logs(risk_score DESC, timestamp DESC);
 CREATE INDEX idx_logs_user ON logs(user_name);
 CREATE INDEX idx_logs_ip ON logs(ip_address);
 